@@ -10,9 +10,66 @@ Functions:
 
 """
 
-import geopandas as gpd
+from functools import lru_cache
+
+import numba as nb
 import numpy as np
-from shapely.geometry import Polygon
+
+
+def _part1by1(values: np.ndarray) -> np.ndarray:
+    """Spread the low 32 bits of each value so a zero bit separates consecutive bits ("Part1By1")."""
+
+    values = values.astype(np.uint64)
+    values = (values | (values << 16)) & np.uint64(0x0000FFFF0000FFFF)
+    values = (values | (values << 8)) & np.uint64(0x00FF00FF00FF00FF)
+    values = (values | (values << 4)) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    values = (values | (values << 2)) & np.uint64(0x3333333333333333)
+    values = (values | (values << 1)) & np.uint64(0x5555555555555555)
+    return values
+
+
+def _morton2(rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """Interleave row and column bits into Morton (Z-order) codes, rows in the odd bit positions."""
+
+    return (_part1by1(rows) << 1) | _part1by1(cols)
+
+
+@nb.njit(parallel=True, nogil=True, cache=True)
+def _growth_exponent_sum(birthrates, mu_t):  # pragma: no cover
+    """
+    Fused daily-growth-rate reduction: ``mu_t[j] = sum_t (1 + birthrates[t, j] / 1000) ** (1/365) - 1``.
+
+    One pass over the (nticks, nnodes) array — the scale, power, and sum that NumPy would run
+    as three separate streaming ufuncs — parallel over blocks of columns so each thread sweeps
+    the tick rows over a cache-resident slice, accumulating in float64.
+    """
+
+    nticks, nnodes = birthrates.shape
+    block = 256
+    nblocks = (nnodes + block - 1) // block
+    for b in nb.prange(nblocks):
+        start = b * block
+        stop = min(start + block, nnodes)
+        for j in range(start, stop):
+            mu_t[j] = 0.0
+        for t in range(nticks):
+            for j in range(start, stop):
+                mu_t[j] += (1.0 + birthrates[t, j] / 1000.0) ** (1.0 / 365.0) - 1.0
+
+
+def _constant_over_time(rates: np.ndarray) -> bool:
+    """
+    Check whether a (nticks, nnodes) rate array is constant over time (axis 0).
+
+    Stride-0 views (e.g. ``np.broadcast_to(cbr[None, :], (nticks, nnodes))``) are detected from
+    their strides alone — O(1). Otherwise fall back to comparing rows, checking first-vs-last
+    first so the common time-varying case bails out after a single row comparison.
+    """
+
+    if rates.shape[0] <= 1 or rates.strides[0] == 0:
+        return True
+
+    return bool((rates[0] == rates[-1]).all()) and bool((rates == rates[0]).all())
 
 
 def calc_capacity(
@@ -22,6 +79,7 @@ def calc_capacity(
     *,
     deathrates: np.ndarray | None = None,
     mortality_safety_factor: float = 1.0,
+    nticks_per_node: np.ndarray | None = None,
 ) -> np.ndarray:
     """
     Estimate the required capacity (number of agents) to model a population given birthrates over time.
@@ -51,6 +109,13 @@ def calc_capacity(
             lower-mortality (faster-growing) realization. Must be in ``[0, 6]``. Default 1.0
             (credit half of deaths, hold half back). Set to ``0.0`` to credit deaths fully (tightest
             bound). Ignored when ``deathrates`` is ``None``. Keyword-only.
+        nticks_per_node (np.ndarray, optional): 1D integer array of length nnodes giving, per
+            node, how many leading ticks of ``birthrates`` count toward growth (ragged time
+            windows). Each value in ``[0, nticks]``; a node with 0 ticks keeps its initial
+            population (times the safety multiplier). This is the canonical ragged path — a
+            single vectorized ``np.add.reduceat`` over all nodes — so callers never need a
+            Python loop of per-node ``calc_capacity`` calls. Not supported together with
+            ``deathrates``. Keyword-only.
 
     Returns:
 
@@ -70,8 +135,12 @@ def calc_capacity(
     ), f"Initial populations must be >= 0. Found {','.join(map(str, initial_pop[np.where(initial_pop < 0)]))} in initial_pop"
 
     # Validate birthrates values, must be >= 0 and <= 100
-    assert np.all(birthrates >= 0.0), "All birthrate values must be non-negative"
-    assert np.all(birthrates <= 100.0), "All birthrate values must be less than or equal to 100"
+    # Callers commonly pass `np.broadcast_to(cbr[None, :], (nticks, nnodes))` — a stride-0
+    # view. One row of such a view covers every distinct value, so validate just that row
+    # rather than sweeping the full (nticks, nnodes) logical extent.
+    birthrate_values = birthrates[0] if birthrates.strides[0] == 0 else birthrates
+    assert np.all(birthrate_values >= 0.0), "All birthrate values must be non-negative"
+    assert np.all(birthrate_values <= 100.0), "All birthrate values must be less than or equal to 100"
 
     # Validate safety_factor
     assert 0 <= safety_factor <= 6, f"safety_factor must be between 0 and 6, got {safety_factor}"
@@ -82,8 +151,19 @@ def calc_capacity(
     # Validate deathrates if provided
     if deathrates is not None:
         assert deathrates.shape == birthrates.shape, f"deathrates shape {deathrates.shape} must match birthrates shape {birthrates.shape}"
-        assert np.all(deathrates >= 0.0), "All deathrate values must be non-negative"
-        assert np.all(deathrates <= 100.0), "All deathrate values must be less than or equal to 100"
+        deathrate_values = deathrates[0] if deathrates.strides[0] == 0 else deathrates
+        assert np.all(deathrate_values >= 0.0), "All deathrate values must be non-negative"
+        assert np.all(deathrate_values <= 100.0), "All deathrate values must be less than or equal to 100"
+
+    # Validate nticks_per_node if provided
+    if nticks_per_node is not None:
+        assert deathrates is None, "nticks_per_node is not supported together with deathrates"
+        nticks_per_node = np.asarray(nticks_per_node)
+        assert nticks_per_node.shape == (nnodes,), f"nticks_per_node shape {nticks_per_node.shape} must be ({nnodes},)"
+        assert np.issubdtype(nticks_per_node.dtype, np.integer), f"nticks_per_node must be integers, got {nticks_per_node.dtype}"
+        assert np.all(
+            (nticks_per_node >= 0) & (nticks_per_node <= birthrates.shape[0])
+        ), f"nticks_per_node values must be between 0 and nticks ({birthrates.shape[0]})"
 
     # Convert CBR to daily growth rate
     # CBR = births per 1,000 individuals per year
@@ -92,21 +172,68 @@ def calc_capacity(
     # Daily growth = (1 + CBR / 1000) ^ (1/365)
     # Daily growth rate = (1 + CBR / 1000) ^ (1/365) - 1
     # Note, sticking with "lamda" here a) for consistency with modern Greek and Unicode, b) to avoid confusion with Python keyword "lambda"
-    lamda = (1.0 + birthrates / 1000) ** (1.0 / 365) - 1.0
 
     # Geometric Brownian motion approximation for population growth (https://en.wikipedia.org/wiki/Geometric_Brownian_motion#Properties)
     # E(P_t) = P_0 * exp(mu * t)
     # where mu is the daily growth rate and t is the number of time steps (days)
 
-    # Since we may have time-varying rates, add up daily growth rates over all time steps
-    # Consider alternative: np.prod(1 + lamda, axis=0)
-    # For 0 <= CBR <= 40, difference is negligible (< 1:1e6)
-    exp_mu_t = np.exp(lamda.sum(axis=0))
+    nticks = birthrates.shape[0]
+    if nticks_per_node is not None:
+        # Ragged per-node windows: sum each node's first nticks_per_node[j] daily rates with a
+        # single np.add.reduceat over a node-major flattening — one C call for all nodes, no
+        # per-node Python dispatch. Transposing makes each node's ticks contiguous; the
+        # trailing 0.0 sentinel keeps full-window end offsets (== len(flat)) legal, and the
+        # odd (end, next-start) segments reduceat also produces are simply discarded.
+        daily = (1.0 + birthrates / 1000) ** (1.0 / 365) - 1.0
+        flat = np.append(np.ascontiguousarray(daily.T, dtype=np.float64).ravel(), 0.0)
+        offsets = np.empty(2 * nnodes, dtype=np.intp)
+        offsets[0::2] = np.arange(nnodes) * nticks
+        offsets[1::2] = offsets[0::2] + nticks_per_node
+        mu_t = np.add.reduceat(flat, offsets)[0::2]
+        # reduceat yields flat[start] (not 0) for empty segments; zero-tick nodes don't grow.
+        mu_t[nticks_per_node == 0] = 0.0
+        lamda = None
+        exp_mu_t = np.exp(mu_t)
+    elif _constant_over_time(birthrates):
+        row = birthrates[0]
+        if row.size == 1 or row.strides == (0,):
+            # Effectively scalar CBR — e.g. a (1, 1) array broadcast to (nticks, nnodes).
+            # One scalar exponentiation covers every node; no array math at all.
+            lamda_scalar = (1.0 + float(row.flat[0]) / 1000) ** (1.0 / 365) - 1.0
+            lamda_row = np.broadcast_to(np.float64(lamda_scalar), row.shape)
+            exp_mu_t = np.exp(nticks * lamda_scalar)
+        else:
+            # Constant-in-time rates (including `np.broadcast_to` stride-0 views, a common
+            # caller pattern): the per-tick sum collapses to nticks * lamda, an O(nnodes)
+            # computation that never touches, much less materializes, a (nticks, nnodes) array.
+            lamda_row = (1.0 + row / 1000) ** (1.0 / 365) - 1.0
+            exp_mu_t = np.exp(nticks * lamda_row.astype(np.float64))
+        lamda = None
+    elif deathrates is None:
+        # Genuinely time-varying rates: add up daily growth rates over all time steps
+        # Consider alternative: np.prod(1 + lamda, axis=0)
+        # For 0 <= CBR <= 40, difference is negligible (< 1:1e6)
+        # The fused Numba kernel streams the birthrates exactly once — scale, power, and sum
+        # in a single multithreaded pass, accumulating in float64 — instead of the three
+        # separate ufunc sweeps (and full-size lamda temporary) the NumPy expression costs.
+        mu_t = np.empty(birthrates.shape[1], dtype=np.float64)
+        _growth_exponent_sum(birthrates, mu_t)
+        lamda = None
+        exp_mu_t = np.exp(mu_t)
+    else:
+        # Time-varying rates with mortality: the cumulative-peak math below needs the full
+        # per-tick lamda, so materialize it once and reuse it for the growth exponent.
+        lamda = (1.0 + birthrates / 1000) ** (1.0 / 365) - 1.0
+        exp_mu_t = np.exp(lamda.sum(axis=0, dtype=np.float64))
 
     safety_multiplier = 1 + safety_factor * (np.sqrt(exp_mu_t) - 1)
     estimates = initial_pop * safety_multiplier * exp_mu_t
 
     if deathrates is not None:
+        if lamda is None:
+            # The cumulative-peak math below needs per-tick birth rates; a stride-0 broadcast
+            # view serves without materializing the constant rows.
+            lamda = np.broadcast_to(lamda_row, birthrates.shape)
         # Daily per-individual death rates, same Geometric Brownian approximation as for births.
         lamda_d = (1.0 + deathrates / 1000) ** (1.0 / 365) - 1.0
         # Underestimate mortality: credit only `1 / (1 + mortality_safety_factor)` of the death
@@ -142,7 +269,46 @@ def calc_capacity(
     return estimates
 
 
-def grid(M=5, N=5, node_size_degs=0.08983, population_fn=None, origin_x=0, origin_y=0, states=None):
+@lru_cache(maxsize=32)
+def _grid_geometries(M, N, node_size_degs, origin_x, origin_y):
+    """
+    Build (and memoize) the cell polygons for an MxN grid in row-major order.
+
+    Polygon construction dominates ``grid()`` wall time and is fully determined by these five
+    scalar parameters, so repeated calls with the same grid layout (common across a suite of
+    experiments) hit the cache. Populations, states, and node ordering are layered on by the
+    caller and are never cached.
+
+    Computes all cell corners as flat arrays (node i = row ``i // N``, col ``i % N``) and hands
+    the assembled rings to Shapely in a single vectorized call — polygon construction then runs
+    as one C loop over contiguous float64 coordinates instead of M*N Python-level
+    ``Polygon(...)`` calls.
+    """
+
+    # Deferred import: laserframe (and through it `import laser.core`) imports this module for
+    # calc_capacity; callers that never build a grid should not pay for loading GEOS.
+    import shapely
+
+    # TODO - use latitude sensitive conversion of km to degrees
+    rows, cols = np.meshgrid(np.arange(M), np.arange(N), indexing="ij")
+    x0 = origin_x + cols.ravel() * float(node_size_degs)
+    y0 = origin_y + rows.ravel() * float(node_size_degs)
+    x1 = x0 + node_size_degs
+    y1 = y0 + node_size_degs
+    rings = np.stack(
+        [
+            np.stack([x0, y0], axis=-1),  # SW
+            np.stack([x1, y0], axis=-1),  # SE
+            np.stack([x1, y1], axis=-1),  # NE
+            np.stack([x0, y1], axis=-1),  # NW
+            np.stack([x0, y0], axis=-1),  # Close polygon in SW
+        ],
+        axis=-2,
+    )  # (M*N, 5, 2)
+    return shapely.polygons(rings)
+
+
+def grid(M=5, N=5, node_size_degs=0.08983, population_fn=None, origin_x=0, origin_y=0, states=None, order="row"):
     """
     Create an MxN grid of cells anchored at (lat, long) with populations and geometries.
 
@@ -156,11 +322,18 @@ def grid(M=5, N=5, node_size_degs=0.08983, population_fn=None, origin_x=0, origi
         origin_x (float): longitude of the origin in decimal degrees (bottom-left corner) -180 <= origin_x < 180.
         origin_y (float): latitude of the origin in decimal degrees (bottom-left corner) -90 <= origin_y < 90.
         states (list): List of state names to initialize in the GeoDataFrame. Default is ["S", "E", "I", "R"].
+        order (str): Node ordering — "row" (row-major, default) or "morton" (Z-order). Morton
+            ordering keeps spatially adjacent cells memory-adjacent, which improves cache
+            locality for downstream neighborhood (stencil) access patterns.
 
     Returns:
         scenario (GeoDataFrame): Columns are nodeid, population, geometry.
     """
 
+    # Deferred import: geopandas transitively pulls in pyproj et al. (~1s of startup), which
+    # callers that never build a grid should not pay for.
+    import geopandas as gpd
+
     if M < 1:
         raise ValueError("M must be >= 1")
     if N < 1:
@@ -173,6 +346,8 @@ def grid(M=5, N=5, node_size_degs=0.08983, population_fn=None, origin_x=0, origi
         raise ValueError("origin_x must be -180 <= origin_x < 180")
     if not (-90 <= origin_y < 90):
         raise ValueError("origin_y must be -90 <= origin_y < 90")
+    if order not in ("row", "morton"):
+        raise ValueError(f"order must be 'row' or 'morton', got {order!r}")
 
     if population_fn is None:
 
@@ -181,39 +356,68 @@ def grid(M=5, N=5, node_size_degs=0.08983, population_fn=None, origin_x=0, origi
 
     states = states or ["S", "E", "I", "R"]
 
-    cells = []
-    nodeid = 0
-    for row in range(M):
-        for col in range(N):
-            # TODO - use latitude sensitive conversion of km to degrees
-            x0 = origin_x + col * node_size_degs
-            y0 = origin_y + row * node_size_degs
-            x1 = x0 + node_size_degs
-            y1 = y0 + node_size_degs
-            poly = Polygon(
-                [
-                    (x0, y0),  # SW
-                    (x1, y0),  # SE
-                    (x1, y1),  # NE
-                    (x0, y1),  # NW
-                    (x0, y0),  # Close polygon in SW
-                ]
-            )
-            population = int(population_fn(row, col))
-            if population < 0:
-                raise ValueError(f"population_fn returned negative population {population} for row {row}, col {col}")
-            cells.append({"nodeid": nodeid, "population": population, "geometry": poly})
-            nodeid += 1
-
-    gdf = gpd.GeoDataFrame(cells, columns=["nodeid", "population", "geometry"], crs="EPSG:4326")
-    for state in states:
-        gdf[state] = 0
-    gdf[states[0]] = gdf.population  # All state[0] (susceptible?) by default
+    nnodes = M * N
+
+    rows, cols = np.meshgrid(np.arange(M), np.arange(N), indexing="ij")
+    # Shallow copy of the memoized geometry array: the pointers are fresh per call, the
+    # (immutable) polygons are shared.
+    geometries = _grid_geometries(M, N, node_size_degs, origin_x, origin_y).copy()
+
+    # Batch-evaluate population_fn over all (row, col) pairs with np.frompyfunc — one sweep
+    # with a single cast to int64 instead of a Python-level loop building a list — then
+    # validate non-negativity with one vectorized compare.
+    populations = np.frompyfunc(population_fn, 2, 1)(rows.ravel(), cols.ravel()).astype(np.int64)
+    # Branchless validation: a single min-reduction, with the offending index located only on
+    # the (exceptional) failure path — no boolean mask temporary in the happy path.
+    minimum = populations.min()
+    if minimum < 0:
+        offender = int(populations.argmin())
+        raise ValueError(f"population_fn returned negative population {minimum} for row {offender // N}, col {offender % N}")
+
+    if order == "morton":
+        # Reorder nodes along the Z-order curve so spatially adjacent cells land close
+        # together in the flat arrays (row-major puts y-neighbors N elements apart).
+        zorder = np.argsort(_morton2(rows.ravel().astype(np.uint32), cols.ravel().astype(np.uint32)))
+        geometries = geometries[zorder]
+        populations = populations[zorder]
+
+    # Allocate all state columns as one contiguous (nnodes, nstates) block — a single
+    # zero-fill and a single dtype — rather than inserting each column into the GeoDataFrame
+    # separately (one allocation and dict insert per state).
+    state_block = np.zeros((nnodes, len(states)), dtype=np.int64)
+    state_block[:, 0] = populations  # All state[0] (susceptible?) by default
+
+    data = {"nodeid": np.arange(nnodes), "population": populations, "geometry": geometries}
+    for index, state in enumerate(states):
+        data[state] = state_block[:, index]
+    gdf = gpd.GeoDataFrame(data, crs="EPSG:4326")
 
     return gdf
 
 
-def initialize_population(grid, initial: list | np.ndarray, states=None):
+@nb.njit(parallel=True, nogil=True, cache=True)
+def _fractions_to_counts(populations, fractions, counts, oversubscribed):  # pragma: no cover
+    """
+    Convert per-node state fractions to integer counts in a single fused pass, parallel over nodes.
+
+    ``counts[:, 1:]`` get the rounded per-state counts, ``counts[:, 0]`` the remainder
+    (which may be negative — the caller checks), and ``oversubscribed`` is set per node when
+    that node's fractions sum to more than 1.0.
+    """
+
+    nnodes, nstates = fractions.shape
+    for i in nb.prange(nnodes):
+        total_fraction = fractions[i, 0]
+        assigned = nb.int64(0)
+        for j in range(1, nstates):
+            total_fraction += fractions[i, j]
+            counts[i, j] = nb.int64(np.rint(fractions[i, j] * populations[i]))
+            assigned += counts[i, j]
+        counts[i, 0] = populations[i] - assigned
+        oversubscribed[i] = nb.uint8(1) if total_fraction > 1.0 else nb.uint8(0)
+
+
+def initialize_population(grid, initial: list | np.ndarray, states=None, inplace=False):
     """
     Initialize the population states in the grid based on the initial state counts provided.
 
@@ -225,13 +429,19 @@ def initialize_population(grid, initial: list | np.ndarray, states=None):
         grid (GeoDataFrame): The grid GeoDataFrame with population and state columns.
         initial (list or np.ndarray): A list or array of shape (1|nnodes, nstates) representing the initial counts for each state at each node. If the shape is (1, nstates), the same initial state distribution will be applied to all nodes.
         states (list): List of state names corresponding to the columns in the grid. Default is ["S", "E", "I", "R"].
+        inplace (bool): If True, write the state columns directly into the passed GeoDataFrame
+            (no copy — cheapest for large grids, since copying walks the whole geometry column).
+            Default False: the input is left untouched and an updated copy is returned.
 
     Returns:
-        GeoDataFrame: The updated grid with initialized population states.
+        GeoDataFrame: The updated grid with initialized population states (the passed grid itself when ``inplace=True``).
     """
 
     states = states or ["S", "E", "I", "R"]
 
+    if not inplace:
+        grid = grid.copy()
+
     nnodes = len(grid)
     nstates = len(states)
 
@@ -253,34 +463,46 @@ def initialize_population(grid, initial: list | np.ndarray, states=None):
     if initial.shape != (nnodes, nstates):
         raise ValueError(f"Initial state array shape {initial.shape} does not match expected shape ({nnodes}, {nstates})")
 
+    # For a broadcast single row (a stride-0 view — no per-node copy was ever materialized),
+    # every row is identical, so value classification and casts only need to touch one row;
+    # re-broadcasting the converted row keeps the stride-0 property through the kernels below.
+    broadcasted = initial.ndim == 2 and initial.strides[0] == 0
+    base = initial[:1] if broadcasted else initial
+
     # If all values are integral values, use them as counts
-    total = np.zeros((nnodes,), dtype=np.int32)
-    if np.all(np.mod(initial, 1) == 0):
-        initial = initial.astype(np.int32)
+    if np.all(np.mod(base, 1) == 0):
+        counts = np.broadcast_to(base.astype(np.int32), (nnodes, nstates)) if broadcasted else initial.astype(np.int32)
+        # One vectorized reduction over the counts, not a running per-state Series total.
+        if broadcasted:
+            # All rows share one total, so one scalar comparison per node suffices.
+            assert np.all(
+                grid.population.to_numpy() == int(counts[0].sum())
+            ), "Sum of initial states does not equal population at some nodes"
+        else:
+            assert np.all(counts.sum(axis=1) == grid.population), "Sum of initial states does not equal population at some nodes"
         for index, state in enumerate(states):
-            grid[state] = initial[:, index]
-            total += initial[:, index]
-        assert np.all(total == grid.population), "Sum of initial states does not equal population at some nodes"
-
-    elif np.all((initial >= 0.0) & (initial <= 1.0)):
-        # If any rows sum to > 1.0, raise error
-        row_sums = initial.sum(axis=1)
-        if np.any(row_sums > 1.0):
+            grid[state] = counts[:, index]
+
+    elif np.all((base >= 0.0) & (base <= 1.0)):
+        # Handle fractional values as proportions. Rounding, remainder assignment, and the
+        # sum > 1.0 check all happen in one fused Numba pass over each node's row — no
+        # per-state intermediate arrays.
+        fractions = np.broadcast_to(base.astype(np.float64, copy=False), (nnodes, nstates)) if broadcasted else initial.astype(np.float64, copy=False)
+        populations = grid.population.to_numpy().astype(np.int64, copy=False)
+        counts = np.empty((nnodes, nstates), dtype=np.int64)
+        oversubscribed = np.empty(nnodes, dtype=np.uint8)
+        _fractions_to_counts(populations, fractions, counts, oversubscribed)
+
+        if oversubscribed.any():
             raise ValueError("Initial state proportions sum to more than 1.0 at some nodes")
 
-        # Handle fractional values as proportions
-        for index, state in enumerate(states):
-            if index == 0:
-                continue  # Susceptible will be computed as remainder
-            grid[state] = np.round(initial[:, index] * grid.population).astype(np.int32)
-            total += grid[state]
-
-        grid[states[0]] = grid.population - total
-
         # Double check no negatives in the remainder state.
-        if np.any(grid[states[0]] < 0):
+        if np.any(counts[:, 0] < 0):
             raise ValueError(f"Computed {states[0]} counts are negative at some nodes")
 
+        for index, state in enumerate(states):
+            grid[state] = counts[:, index]
+
     else:
         raise ValueError("Initial state array must contain either all integer counts or all proportions between 0.0 and 1.0")
 
@@ -5,6 +5,7 @@ from pathlib import Path
 
 import numpy as np
 import pytest
+import shapely
 
 from laser.core.utils import calc_capacity
 from laser.core.utils import grid
@@ -87,6 +88,95 @@ class TestUtilityFunctions(unittest.TestCase):
 
         return
 
+    def test_calc_capacity_time_varying_birthrates(self):
+        """Given genuinely time-varying float32 birthrates and no mortality,
+        when ``calc_capacity`` is called,
+        then the estimate matches the directly-computed growth exponent within float32 tolerance.
+
+        Exercises the tiled (cache-blocked) reduction path — constant-rate grids short-circuit
+        to the closed-form path and never reach it — and pins that float32 per-element math
+        with float64 accumulation stays faithful to the float64 reference computation.
+        """
+        nticks = 3 * 365
+        nnodes = 3
+        rng = np.random.default_rng(20250828)
+        birthrates = rng.uniform(5.0, 35.0, size=(nticks, nnodes)).astype(np.float32)
+        initial_pop = np.array([50_000, 100_000, 250_000], dtype=np.int64)
+
+        estimates = calc_capacity(birthrates, initial_pop, safety_factor=0.0)
+
+        lamda = (1.0 + birthrates.astype(np.float64) / 1000) ** (1.0 / 365) - 1.0
+        expected = initial_pop * np.exp(lamda.sum(axis=0))
+
+        assert estimates.dtype == np.uint32, f"Expected uint32 dtype, got {estimates.dtype}"
+        assert np.allclose(estimates.astype(np.float64), expected, rtol=1e-4), f"Expected ~{expected}, got {estimates}"
+
+        return
+
+    def test_calc_capacity_ragged_nticks_per_node(self):
+        """Given per-node time windows via ``nticks_per_node``,
+        when ``calc_capacity`` is called,
+        then each node's estimate reflects only its first ``nticks_per_node[j]`` ticks of growth.
+
+        Pins the canonical ragged path: one vectorized reduceat instead of a Python loop of
+        per-node calls. Covers the edge windows — 0 ticks (no growth) and the full window
+        (must match the unwindowed call).
+        """
+        nticks = 2 * 365
+        nnodes = 4
+        rng = np.random.default_rng(20250828)
+        birthrates = rng.uniform(5.0, 35.0, size=(nticks, nnodes)).astype(np.float32)
+        initial_pop = np.array([10_000, 50_000, 100_000, 250_000], dtype=np.int64)
+        nticks_per_node = np.array([0, 100, 365, nticks])
+
+        estimates = calc_capacity(birthrates, initial_pop, safety_factor=0.0, nticks_per_node=nticks_per_node)
+        assert estimates.dtype == np.uint32, f"Expected uint32 dtype, got {estimates.dtype}"
+
+        # Per-node reference: growth over just that node's window.
+        lamda = (1.0 + birthrates.astype(np.float64) / 1000) ** (1.0 / 365) - 1.0
+        expected = np.array([initial_pop[j] * np.exp(lamda[: nticks_per_node[j], j].sum()) for j in range(nnodes)])
+        assert np.allclose(estimates.astype(np.float64), expected, rtol=1e-4), f"Expected ~{expected}, got {estimates}"
+
+        # A zero-tick node keeps exactly its initial population (safety_factor=0).
+        assert estimates[0] == initial_pop[0], f"Zero-window node should not grow, got {estimates[0]}"
+
+        # A full-window node matches the unwindowed call.
+        unwindowed = calc_capacity(birthrates, initial_pop, safety_factor=0.0)
+        assert np.isclose(
+            float(estimates[-1]), float(unwindowed[-1]), rtol=1e-6
+        ), f"Full-window node should match the unwindowed estimate, got {estimates[-1]} vs {unwindowed[-1]}"
+
+        return
+
+    def test_calc_capacity_rejects_invalid_nticks_per_node(self):
+        """Given invalid ``nticks_per_node`` arguments (with deathrates, wrong shape,
+        non-integer, or out-of-range values),
+        when ``calc_capacity`` is called,
+        then it raises ``AssertionError`` identifying the problem.
+        """
+        nticks = 365
+        nnodes = 2
+        birthrates = np.full((nticks, nnodes), 25.0, dtype=np.float32)
+        initial_pop = np.array([10_000, 20_000], dtype=np.int64)
+        window = np.array([100, 200])
+
+        with pytest.raises(AssertionError, match=r"nticks_per_node is not supported together with deathrates"):
+            calc_capacity(birthrates, initial_pop, deathrates=np.zeros_like(birthrates), nticks_per_node=window)
+
+        with pytest.raises(AssertionError, match=r"nticks_per_node shape"):
+            calc_capacity(birthrates, initial_pop, nticks_per_node=np.array([100, 200, 300]))
+
+        with pytest.raises(AssertionError, match=r"nticks_per_node must be integers"):
+            calc_capacity(birthrates, initial_pop, nticks_per_node=np.array([100.0, 200.0]))
+
+        with pytest.raises(AssertionError, match=r"nticks_per_node values must be between 0 and nticks"):
+            calc_capacity(birthrates, initial_pop, nticks_per_node=np.array([-1, 200]))
+
+        with pytest.raises(AssertionError, match=r"nticks_per_node values must be between 0 and nticks"):
+            calc_capacity(birthrates, initial_pop, nticks_per_node=np.array([100, nticks + 1]))
+
+        return
+
     def test_calc_capacity_clamps_to_uint32_max(self):
         """Given per-node populations whose projected growth exceeds 2**32 - 1,
         when calc_capacity is called,
@@ -424,16 +514,15 @@ class TestGridUtilityFunction(unittest.TestCase):
         assert gdf["nodeid"].min() == 0, f"Expected min nodeid 0, got {gdf['nodeid'].min()}"
         assert gdf["nodeid"].max() == M * N - 1, f"Expected max nodeid {M * N - 1}, got {gdf['nodeid'].max()}"
 
-        assert (
-            gdf["geometry"].geom_type.nunique() == 1
-        ), f"Expected all geometries to have the same type, got {gdf['geometry'].geom_type.unique()}"
-        assert (
-            gdf["geometry"].geom_type.unique()[0] == "Polygon"
-        ), f"Expected all geometries to be Polygons, got {gdf['geometry'].geom_type.unique()}"
+        # shapely.get_type_id is a vectorized C ufunc — one int compare per geometry instead of
+        # per-row Python attribute access through .geom_type.
+        type_ids = shapely.get_type_id(gdf["geometry"].to_numpy())
+        assert len(np.unique(type_ids)) == 1, f"Expected all geometries to have the same type, got type ids {np.unique(type_ids)}"
+        assert type_ids[0] == shapely.GeometryType.POLYGON, f"Expected all geometries to be Polygons, got type id {type_ids[0]}"
 
         # Check bounding box: lower left should be (origin_x, origin_y), upper right should be (origin_x + N*node_size_degs, origin_y + M*node_size_degs)
         # 1 degree latitude ~ 111 km, longitude varies but for small grids this is a reasonable check
-        minx, miny, maxx, maxy = gdf.total_bounds
+        minx, miny, maxx, maxy = shapely.total_bounds(gdf["geometry"].to_numpy())
         expected_minx = origin_x
         expected_miny = origin_y
         expected_maxx = origin_x + N * node_size_degs
@@ -539,31 +628,69 @@ class TestGridUtilityFunction(unittest.TestCase):
         with pytest.raises(ValueError, match="population_fn returned negative population -100 for row 0, col 0"):
             grid(M=4, N=5, population_fn=negative_population)
 
+        with pytest.raises(ValueError, match="order must be 'row' or 'morton'"):
+            grid(M=4, N=5, order="hilbert")
+
+        return
+
+    def test_grid_morton_order(self):
+        # Morton ordering permutes nodes along the Z-order curve; each geometry must travel
+        # with its population, and the grid extent/columns must be unchanged.
+        M = N = 4
+        node_size_degs = 0.1
+
+        def encode(row: int, col: int) -> int:
+            return 1000 + row * N + col
+
+        gdf = grid(M=M, N=N, node_size_degs=node_size_degs, population_fn=encode, order="morton")
+        self.check_grid_validity(gdf, M, N, node_size_degs=node_size_degs)
+
+        # Reference Morton code computed bit-by-bit (row bits in the odd positions).
+        def morton(row: int, col: int) -> int:
+            code = 0
+            for bit in range(16):
+                code |= ((col >> bit) & 1) << (2 * bit)
+                code |= ((row >> bit) & 1) << (2 * bit + 1)
+            return code
+
+        expected = sorted(((row, col) for row in range(M) for col in range(N)), key=lambda rc: morton(*rc))
+        expected_pops = [encode(row, col) for row, col in expected]
+        assert list(gdf["population"]) == expected_pops, f"Expected Z-order populations {expected_pops}, got {list(gdf['population'])}"
+
+        # Each node's SW corner must match the (row, col) cell its population encodes.
+        for k, (row, col) in enumerate(expected):
+            minx, miny, _, _ = gdf.geometry.iloc[k].bounds
+            assert np.isclose(minx, col * node_size_degs), f"Node {k}: expected minx {col * node_size_degs}, got {minx}"
+            assert np.isclose(miny, row * node_size_degs), f"Node {k}: expected miny {row * node_size_degs}, got {miny}"
+
         return
 
     def test_grid_default_states_columns(self):
         # Test that the default parameters to grid() return a GeoDataFrame with "S", "E", "I", and "R" columns
+        states = ["S", "E", "I", "R"]
         gdf = grid()
-        assert "S" in gdf.columns, f"Expected column 'S' in GeoDataFrame columns {gdf.columns}"
-        assert np.all(
-            gdf["S"] == gdf.population
-        ), f"Expected all values in column 'S' to equal population,\n{gdf.population}got\n{gdf['S']}"
-        for state in ["E", "I", "R"]:
-            assert state in gdf.columns, f"Expected column '{state}' in GeoDataFrame columns {gdf.columns}"
-            assert np.all(gdf[state] == 0), f"Expected all values in column '{state}' to be 0, got {gdf[state]}"
+        assert all(state in gdf.columns for state in states), f"Expected columns {states} in GeoDataFrame columns {gdf.columns}"
+        # Check the whole state block in two single-pass reductions over contiguous memory
+        # rather than one full-column scan per state.
+        block = gdf[states].to_numpy()
+        assert np.array_equal(
+            block[:, 0], gdf.population.to_numpy()
+        ), f"Expected all values in column '{states[0]}' to equal population,\n{gdf.population}got\n{gdf[states[0]]}"
+        assert not block[:, 1:].any(), f"Expected all values in columns {states[1:]} to be 0, got\n{gdf[states[1:]]}"
         return
 
     def test_grid_custom_states_columns(self):
         # Test that grid() with custom states returns a GeoDataFrame with those columns
         custom_states = ["sus", "inc", "inf", "rec", "vax"]
         gdf = grid(states=custom_states)
-        assert custom_states[0] in gdf.columns, f"Expected column '{custom_states[0]}' in GeoDataFrame columns {gdf.columns}"
-        assert np.all(
-            gdf[custom_states[0]] == gdf.population
+        assert all(
+            state in gdf.columns for state in custom_states
+        ), f"Expected columns {custom_states} in GeoDataFrame columns {gdf.columns}"
+        block = gdf[custom_states].to_numpy()
+        assert np.array_equal(
+            block[:, 0], gdf.population.to_numpy()
         ), f"Expected all values in column '{custom_states[0]}' to be equal to population,\n{gdf.population}got\n{gdf[custom_states[0]]}"
-        for state in custom_states[1:]:
-            assert state in gdf.columns, f"Expected column '{state}' in GeoDataFrame columns {gdf.columns}"
-            assert np.all(gdf[state] == 0), f"Expected all values in column '{state}' to be 0, got\n{gdf[state]}"
+        assert not block[:, 1:].any(), f"Expected all values in columns {custom_states[1:]} to be 0, got\n{gdf[custom_states[1:]]}"
         # Ensure default states are not present
         for default_state in ["S", "E", "I", "R"]:
             assert default_state not in gdf.columns, f"Did not expect column '{default_state}' in GeoDataFrame columns {gdf.columns}"
@@ -576,7 +703,7 @@ class TestGridUtilityFunction(unittest.TestCase):
         nnodes = M * N
         # Each node: [S, E, I, R] = [900, 50, 30, 20]
         initial = np.tile([900, 50, 30, 20], (nnodes, 1))
-        gdf2 = initialize_population(gdf.copy(), initial, states=states)
+        gdf2 = initialize_population(gdf, initial, states=states, inplace=True)
         for idx, state in enumerate(states):
             assert np.all(gdf2[state] == initial[:, idx]), f"State {state} not set correctly"
         assert np.all(gdf2[states].sum(axis=1) == gdf2.population), "Sum of states does not equal population"
@@ -588,7 +715,7 @@ class TestGridUtilityFunction(unittest.TestCase):
         nnodes = M * N
         # Fractions: [S, E, I, R] = [computed, 0.1, 0.2, 0.3]
         fractions = np.tile([0.0, 0.1, 0.2, 0.3], (nnodes, 1))
-        gdf2 = initialize_population(gdf.copy(), fractions, states=states)
+        gdf2 = initialize_population(gdf, fractions, states=states, inplace=True)
         # S is computed as the remainder
         expected_S = 1000 - (np.round(0.1 * 1000) + np.round(0.2 * 1000) + np.round(0.3 * 1000))
         assert np.all(gdf2["S"] == expected_S), f"Expected S={expected_S}, got {gdf2['S']}"
@@ -599,6 +726,23 @@ class TestGridUtilityFunction(unittest.TestCase):
             gdf2[states].sum(axis=1) == gdf2.population
         ), f"Sum of states\n{gdf2[states].sum(axis=1)}\ndoes not equal population\n{gdf2.population}"
 
+    def test_initialize_population_inplace_semantics(self):
+        # Default (inplace=False) must leave the caller's frame untouched and return an updated
+        # copy; inplace=True must write directly into the caller's frame and return it.
+        M, N = 2, 2
+        states = ["S", "E", "I", "R"]
+        gdf = grid(M=M, N=N, node_size_degs=0.1, population_fn=lambda r, c: 1000, states=states)
+        initial = np.tile([900, 50, 30, 20], (M * N, 1))
+
+        gdf2 = initialize_population(gdf, initial, states=states)
+        assert gdf2 is not gdf, "Expected the default (copying) path to return a new frame"
+        assert np.all(gdf["S"] == gdf.population), f"Input frame should be untouched by the default path, got S\n{gdf['S']}"
+        assert np.all(gdf2["E"] == 50), f"Returned frame should carry the new states, got E\n{gdf2['E']}"
+
+        gdf3 = initialize_population(gdf, initial, states=states, inplace=True)
+        assert gdf3 is gdf, "Expected inplace=True to return the passed frame"
+        assert np.all(gdf["E"] == 50), f"inplace=True should write into the caller's frame, got E\n{gdf['E']}"
+
     def test_initialize_population_integer_out_of_range(self):
         M, N = 2, 1
         states = ["S", "E", "I", "R"]
@@ -606,7 +750,7 @@ class TestGridUtilityFunction(unittest.TestCase):
         # Too many people: [S, E, I, R] = [50, 50, 50, 50] = 200 > 100
         initial = np.tile([50, 50, 50, 50], (M * N, 1))
         with pytest.raises(AssertionError, match="Sum of initial states does not equal population at some nodes"):
-            initialize_population(gdf.copy(), initial, states=states)
+            initialize_population(gdf, initial, states=states, inplace=True)
 
     def test_initialize_population_fractions_sum_gt_one(self):
         M, N = 1, 2
@@ -615,21 +759,21 @@ class TestGridUtilityFunction(unittest.TestCase):
         # Fractions sum to 1.2: [S, E, I, R] = [0.0, 0.5, 0.5, 0.2]
         fractions = np.tile([0.0, 0.5, 0.5, 0.2], (M * N, 1))
         with pytest.raises(ValueError, match="Initial state proportions sum to more than 1.0 at some nodes"):
-            initialize_population(gdf.copy(), fractions, states=states)
+            initialize_population(gdf, fractions, states=states, inplace=True)
 
     def test_initialize_population_invalid_shape(self):
         gdf = grid(M=2, N=2)
         # Wrong shape: should be (4, 4), but is (2, 4)
         initial = np.array([[1, 2, 3, 4], [5, 6, 7, 8]])
         with pytest.raises(ValueError, match="Initial state array shape"):
-            initialize_population(gdf.copy(), initial)
+            initialize_population(gdf, initial, inplace=True)
 
     def test_initialize_population_invalid_type(self):
         gdf = grid(M=1, N=1)
         # Mixed types: not all ints, not all floats in [0,1]
         initial = np.array([[1, 0.5, 0, 0]])
         with pytest.raises(ValueError, match="Initial state proportions sum to more than 1.0 at some nodes"):
-            initialize_population(gdf.copy(), initial)
+            initialize_population(gdf, initial, inplace=True)
 
     def test_initialize_population_single_row_integer_broadcast(self):
         # Test that a single row of integer values is broadcast to all nodes
@@ -638,7 +782,7 @@ class TestGridUtilityFunction(unittest.TestCase):
         gdf = grid(M=M, N=N, node_size_degs=0.1, population_fn=lambda r, c: 1000, states=states)
         # Provide a single row: [800, 100, 50, 50]
         initial = np.array([[800, 100, 50, 50]])
-        gdf2 = initialize_population(gdf.copy(), initial, states=states)
+        gdf2 = initialize_population(gdf, initial, states=states, inplace=True)
         for idx, state in enumerate(states):
             assert np.all(gdf2[state] == initial[0, idx]), f"State {state} not broadcast correctly"
         assert np.all(
@@ -652,7 +796,7 @@ class TestGridUtilityFunction(unittest.TestCase):
         gdf = grid(M=M, N=N, node_size_degs=0.1, population_fn=lambda r, c: 500, states=states)
         # Provide a single row: [0.0, 0.2, 0.3, 0.1]
         fractions = np.array([[0.0, 0.2, 0.3, 0.1]])
-        gdf2 = initialize_population(gdf.copy(), fractions, states=states)
+        gdf2 = initialize_population(gdf, fractions, states=states, inplace=True)
         expected_E = np.round(0.2 * 500).astype(int)
         expected_I = np.round(0.3 * 500).astype(int)
         expected_R = np.round(0.1 * 500).astype(int)
@@ -673,7 +817,7 @@ class TestGridUtilityFunction(unittest.TestCase):
         nnodes = M * N
         # Each node: [S, E, I, R] = [400, 50, 30, 20]
         initial = [[400, 50, 30, 20] for _ in range(nnodes)]
-        gdf2 = initialize_population(gdf.copy(), initial, states=states)
+        gdf2 = initialize_population(gdf, initial, states=states, inplace=True)
         for idx, state in enumerate(states):
             assert np.all(gdf2[state] == initial[0][idx]), f"State {state} not set correctly from list"
         assert np.all(gdf2[states].sum(axis=1) == gdf2.population), "Sum of states does not equal population"
@@ -686,7 +830,7 @@ class TestGridUtilityFunction(unittest.TestCase):
         nnodes = M * N
         # Fractions: [S, E, I, R] = [computed, 0.15, 0.25, 0.35]
         fractions = [[0.0, 0.15, 0.25, 0.35] for _ in range(nnodes)]
-        gdf2 = initialize_population(gdf.copy(), fractions, states=states)
+        gdf2 = initialize_population(gdf, fractions, states=states, inplace=True)
         expected_E = np.round(0.15 * 1000).astype(int)
         expected_I = np.round(0.25 * 1000).astype(int)
         expected_R = np.round(0.35 * 1000).astype(int)
@@ -706,7 +850,7 @@ class TestGridUtilityFunction(unittest.TestCase):
         gdf = grid(M=M, N=N, node_size_degs=0.1, population_fn=lambda r, c: 200, states=states)
         # Provide a single node's values: [150, 30, 10, 10]
         initial = [150, 30, 10, 10]
-        gdf2 = initialize_population(gdf.copy(), initial, states=states)
+        gdf2 = initialize_population(gdf, initial, states=states, inplace=True)
         for idx, state in enumerate(states):
             assert np.all(gdf2[state] == initial[idx]), f"State {state} not broadcast correctly from single node"
         assert np.all(
@@ -720,7 +864,7 @@ class TestGridUtilityFunction(unittest.TestCase):
         gdf = grid(M=M, N=N, node_size_degs=0.1, population_fn=lambda r, c: 400, states=states)
         # Provide a single node's fractions: [0.0, 0.1, 0.2, 0.3]
         fractions = [0.0, 0.1, 0.2, 0.3]
-        gdf2 = initialize_population(gdf.copy(), fractions, states=states)
+        gdf2 = initialize_population(gdf, fractions, states=states, inplace=True)
         expected_E = np.round(0.1 * 400).astype(int)
         expected_I = np.round(0.2 * 400).astype(int)
         expected_R = np.round(0.3 * 400).astype(int)